@@ -5,20 +5,50 @@ import json
 from ruamel import yaml
 import os
 import re
+import sqlite3
 import ssl
 import subprocess
 import sys
+import tempfile
 from typing import Sequence
 from urllib.request import urlopen
 
+try:
+    import fcntl
+except ImportError:  # Windows: atomic replace alone still avoids torn reads
+    fcntl = None
+
 TERMINAL_COLOR_ERROR = "\033[1;31;40m"
 TERMINAL_COLOR_WARNING = "\033[1;33;40m"
 TERMINAL_COLOR_NORMAL = "\033[0;37;40m"
 TERMINAL_COLOR_PASS = "\033[1;32;40m"
+OAF_CACHE_SCHEMA_VERSION = 1
+OAF_CACHE_COMPACTION_INTERVAL = 50
+OAF_CACHE_MAX_VALIDATED_HEADS = 20
+PRE_COMMIT_GIT_HOOK_TYPES = [
+    "pre-commit",
+    "pre-merge-commit",
+    "pre-push",
+    "prepare-commit-msg",
+    "commit-msg",
+    "post-checkout",
+    "post-commit",
+    "post-merge",
+    "post-rewrite",
+    "pre-rebase",
+]
+PRE_COMMIT_LEGACY_STAGES = {
+    "commit": "pre-commit",
+    "merge-commit": "pre-merge-commit",
+    "push": "pre-push",
+}
 oaf_config = {"cache": {}, "live": {}}
+oaf_state = {"file": None, "repos": {}, "configs": {}, "dirty": []}
+oaf_repository = {}
 
 
-def load_config(use_cache=True) -> int:
+def get_pre_commit_home() -> str:
+    """Determine the pre-commit home directory where hook state is cached"""
     pre_commit_home = os.getenv("PRE_COMMIT_HOME")
     if pre_commit_home is None or os.path.exists(pre_commit_home) == False:
         if (
@@ -32,7 +62,75 @@ def load_config(use_cache=True) -> int:
             pre_commit_home = user_home + "/.cache/pre-commit"
             if os.path.exists(pre_commit_home) == False:
                 os.makedirs(pre_commit_home)
+    return pre_commit_home
+
 
+def read_cache_file(cache_path) -> dict:
+    """Read a cache file, ignoring it if missing, corrupt or of another schema"""
+    try:
+        with open(cache_path) as json_file:
+            cache = json.load(json_file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict):
+        return {}
+    if "version" not in cache and "OAF_REQUIRED_HOOKS" in cache:
+        # v1.3.x cached the raw config without a schema
+        return {"version": OAF_CACHE_SCHEMA_VERSION, "writes": 0, "data": cache}
+    if cache.get("version") != OAF_CACHE_SCHEMA_VERSION:
+        return {}
+    return cache
+
+
+def read_cache(cache_path) -> dict:
+    """Read the data stored in a cache file"""
+    return read_cache_file(cache_path).get("data", {})
+
+
+def update_cache(cache_path, update, compact=None) -> dict:
+    """Read-modify-write a cache file under an exclusive advisory lock
+
+    `update` receives the cached data and returns the data to store. The file
+    is replaced atomically so lock-free readers never see a partial write, and
+    `compact` prunes the data every `OAF_CACHE_COMPACTION_INTERVAL` writes.
+    """
+    with open(cache_path + ".lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            cache = read_cache_file(cache_path)
+            writes = cache.get("writes", 0)
+            data = update(cache.get("data", {}))
+            writes += 1
+            if compact is not None and writes % OAF_CACHE_COMPACTION_INTERVAL == 0:
+                data = compact(data)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(cache_path), prefix=".oaf_", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "w") as fp:
+                    json.dump(
+                        {
+                            "version": OAF_CACHE_SCHEMA_VERSION,
+                            "writes": writes,
+                            "data": data,
+                        },
+                        fp,
+                    )
+                    fp.flush()
+                    os.fsync(fp.fileno())
+                os.replace(tmp_path, cache_path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    return data
+
+
+def load_config(use_cache=True) -> int:
+    pre_commit_home = get_pre_commit_home()
     config_file_path = pre_commit_home + "/oaf_pre-commit_config.json"
     try:
         config_url = "https://raw.githubusercontent.com/one-acre-fund/oaf-pre-commit-hooks/main/config.json"
@@ -41,8 +139,8 @@ def load_config(use_cache=True) -> int:
             oaf_config["live"] = json.load(f)
             if len(oaf_config["live"]) > 1:
                 oaf_config["cache"] = oaf_config["live"]
-                with open(config_file_path, "w") as fp:
-                    json.dump(oaf_config["live"], fp)
+                if read_cache(config_file_path) != oaf_config["live"]:
+                    update_cache(config_file_path, lambda cache: oaf_config["live"])
     except Exception as e:
         print(
             "%sFailed to get config from %s while cache= %s %s"
@@ -50,9 +148,8 @@ def load_config(use_cache=True) -> int:
         )
         print("%s trace: %s %s" % (TERMINAL_COLOR_WARNING, e, TERMINAL_COLOR_NORMAL))
 
-    if len(oaf_config["live"]) < 1 and os.path.exists(config_file_path):
-        with open(config_file_path) as json_file:
-            oaf_config["cache"] = json.load(json_file)
+    if len(oaf_config["live"]) < 1:
+        oaf_config["cache"] = read_cache(config_file_path)
 
     if len(oaf_config["cache"]) < 1 and len(oaf_config["live"]) < 1:
         oaf_config["cache"] = oaf_config["live"] = {
@@ -79,6 +176,7 @@ def load_config(use_cache=True) -> int:
                 "gitlint": {
                     "args": ["--verbose"],
                     "repo": "https://github.com/jorisroovers/gitlint",
+                    "stages": ["commit-msg"],
                 },
                 "markdownlint": {
                     "args": [
@@ -91,6 +189,190 @@ def load_config(use_cache=True) -> int:
     return len(oaf_config)
 
 
+def get_repository_paths() -> dict:
+    """Resolve the toplevel, shared git dir, hooks dir and superproject"""
+    if len(oaf_repository) < 1:
+        lines = subprocess.getoutput(
+            "git rev-parse --show-toplevel --git-common-dir --git-path hooks"
+            " --show-superproject-working-tree"
+        ).split("\n")
+        lines += [lines[0]] * (3 - len(lines))
+        oaf_repository["toplevel"] = lines[0]
+        # linked worktrees share the common dir of their main repository
+        oaf_repository["common_dir"] = os.path.abspath(lines[1])
+        # honours `core.hooksPath`
+        oaf_repository["hooks_dir"] = os.path.abspath(lines[2])
+        oaf_repository["superproject"] = lines[3] if len(lines) > 3 else None
+    return oaf_repository
+
+
+def get_pre_commit_config_path() -> str:
+    """Locate `.pre-commit-config.yaml`, falling back to the superproject's"""
+    paths = get_repository_paths()
+    config_path = os.path.join(paths["toplevel"], ".pre-commit-config.yaml")
+    if os.path.exists(config_path) == False and paths["superproject"]:
+        superproject_path = os.path.join(
+            paths["superproject"], ".pre-commit-config.yaml"
+        )
+        if os.path.exists(superproject_path):
+            return superproject_path
+    return config_path
+
+
+def get_file_fingerprint(path) -> list:
+    """Fingerprint a file by modification time and size"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return []
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def load_state() -> dict:
+    """Load the cached state of the current repository"""
+    if oaf_state["file"] is None:
+        oaf_state["file"] = get_pre_commit_home() + "/oaf_pre-commit_state.json"
+        state = read_cache(oaf_state["file"])
+        oaf_state["repos"] = state.get("repos", {})
+        oaf_state["configs"] = state.get("configs", {})
+    common_dir = get_repository_paths()["common_dir"]
+    return oaf_state["repos"].setdefault(
+        common_dir, {"validated_heads": {}, "gitlint": {}}
+    )
+
+
+def merge_state(state) -> dict:
+    """Merge the entries changed by this run into the state of concurrent runs"""
+    state.setdefault("repos", {})
+    state.setdefault("configs", {})
+    for entry in oaf_state["dirty"]:
+        if entry[0] == "configs":
+            state["configs"][entry[1]] = entry[2]
+            continue
+        cached_repo = state["repos"].setdefault(
+            entry[1], {"validated_heads": {}, "gitlint": {}}
+        )
+        if entry[0] == "gitlint":
+            cached_repo["gitlint"][entry[2]] = entry[3]
+        elif entry[0] == "validated_head":
+            cached_heads = cached_repo["validated_heads"].setdefault(entry[2], [])
+            if entry[3] not in cached_heads:
+                cached_heads.append(entry[3])
+        elif entry[0] == "missing_head":
+            cached_heads = cached_repo["validated_heads"].get(entry[2], [])
+            if entry[3] in cached_heads:
+                cached_heads.remove(entry[3])
+    return state
+
+
+def compact_state(state) -> dict:
+    """Drop state of deleted repositories and files, and old validated heads"""
+    state["repos"] = {
+        common_dir: repo
+        for common_dir, repo in state["repos"].items()
+        if os.path.isdir(common_dir)
+    }
+    for repo in state["repos"].values():
+        repo["gitlint"] = {
+            path: fingerprint
+            for path, fingerprint in repo["gitlint"].items()
+            if os.path.exists(path)
+        }
+        for key, heads in repo["validated_heads"].items():
+            repo["validated_heads"][key] = heads[-OAF_CACHE_MAX_VALIDATED_HEADS:]
+    state["configs"] = {
+        path: config
+        for path, config in state["configs"].items()
+        if os.path.exists(path)
+    }
+    return state
+
+
+def save_state():
+    """Persist the state entries changed by this run"""
+    if len(oaf_state["dirty"]) < 1:
+        return
+    try:
+        state = update_cache(oaf_state["file"], merge_state, compact_state)
+        oaf_state["repos"] = state["repos"]
+        oaf_state["configs"] = state["configs"]
+    except Exception as e:
+        print("%s trace: %s %s" % (TERMINAL_COLOR_WARNING, e, TERMINAL_COLOR_NORMAL))
+    # the cache is best effort: never retry entries that failed to persist
+    oaf_state["dirty"] = []
+
+
+def set_config_state(config_path, config_state):
+    """Cache the parsed `.pre-commit-config.yaml` at `config_path`"""
+    oaf_state["configs"][config_path] = config_state
+    oaf_state["dirty"].append(["configs", config_path, config_state])
+
+
+def set_gitlint_state(gitlint_path, fingerprint):
+    """Cache the fingerprint of a `.gitlint` found complete"""
+    common_dir = get_repository_paths()["common_dir"]
+    load_state()["gitlint"][gitlint_path] = fingerprint
+    oaf_state["dirty"].append(["gitlint", common_dir, gitlint_path, fingerprint])
+
+
+def add_validated_head(heads_key, head):
+    """Cache a HEAD whose history was validated"""
+    common_dir = get_repository_paths()["common_dir"]
+    load_state()["validated_heads"].setdefault(heads_key, []).append(head)
+    oaf_state["dirty"].append(["validated_head", common_dir, heads_key, head])
+
+
+def load_pre_commit_config() -> dict:
+    """Parse `.pre-commit-config.yaml`, reusing the cached parse if unchanged"""
+    load_state()
+    config_path = get_pre_commit_config_path()
+    fingerprint = get_file_fingerprint(config_path)
+    cached = oaf_state["configs"].get(config_path)
+    if cached is not None and cached["fingerprint"] == fingerprint:
+        return cached["config"]
+    with open(config_path, "r") as stream:
+        # YAML values such as `rev: 2023-01-01` parse to types JSON cannot hold
+        config = json.loads(json.dumps(yaml.safe_load(stream), default=str))
+    set_config_state(config_path, {"fingerprint": fingerprint, "config": config})
+    return config
+
+
+def drop_validated_heads(heads_key, heads):
+    """Forget cached HEADs, e.g. commits pruned after an amend or rebase"""
+    common_dir = get_repository_paths()["common_dir"]
+    validated_heads = load_state()["validated_heads"].setdefault(heads_key, [])
+    for head in heads:
+        validated_heads.remove(head)
+        oaf_state["dirty"].append(["missing_head", common_dir, heads_key, head])
+
+
+def get_missing_commits(shas) -> list:
+    """Determine which of the given commits no longer exist in the repository"""
+    if len(shas) < 1:
+        return []
+    # never fetch from a promisor remote just to check for a commit
+    result = subprocess.run(
+        ["git", "cat-file", "--batch-check"],
+        input="\n".join(shas).encode("utf-8"),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        env=dict(os.environ, GIT_NO_LAZY_FETCH="1"),
+    )
+    if result.returncode != 0:
+        return []
+    lines = result.stdout.decode("utf-8").split("\n")
+    return [
+        sha
+        for sha, line in zip(shas, lines)
+        if len(line.split()) < 2 or line.split()[1] != "commit"
+    ]
+
+
+def get_validated_heads_key(lts_branches) -> str:
+    """Key validated heads by the rules they were validated against"""
+    return ",".join(lts_branches) + ":" + ",".join(get_git_conventional_commit_types())
+
+
 def contains_config_directive(cfg, dir):
     return re.findall(dir, cfg, re.M)
 
@@ -106,16 +388,146 @@ def is_hook_installed_cli(hook, info) -> bool:
     return no_hook_found == -1
 
 
+def normalize_repo_url(url) -> str:
+    """Normalize a hook repository URL so that equivalent URLs compare equal"""
+    url = url.strip().rstrip("/")
+    if url.endswith(".git"):
+        url = url[: -len(".git")]
+    ssh_url = re.match(r"^(?:ssh://)?git@([^:/]+)[:/](.+)$", url)
+    if ssh_url:
+        url = "https://%s/%s" % ssh_url.groups()
+    elif url.startswith("http://"):
+        url = "https://" + url[len("http://") :]
+    return url.lower()
+
+
+def is_git_hook_installed(hook_type) -> bool:
+    """Determine if `pre-commit install` generated the given Git hook script"""
+    # a submodule runs its own hooks, even when using its superproject's
+    # config through `pre-commit install -c ../.pre-commit-config.yaml`
+    hook_path = os.path.join(get_repository_paths()["hooks_dir"], hook_type)
+    try:
+        with open(hook_path) as hook_file:
+            return "File generated by pre-commit" in hook_file.read()
+    except OSError:
+        return False
+
+
+def get_manifest_hook(repo, hook) -> dict:
+    """Read a hook from the manifest of pre-commit's cached clone of `repo`
+
+    Returns None when pre-commit has not cloned the repository at its `rev`.
+    """
+    db_path = os.path.join(get_pre_commit_home(), "db.db")
+    if os.path.exists(db_path) == False:
+        return None
+    try:
+        with sqlite3.connect(db_path) as db:
+            rows = db.execute(
+                "SELECT repo, path FROM repos WHERE ref = ?", (repo["rev"],)
+            ).fetchall()
+    except sqlite3.Error:
+        return None
+    repo_url = normalize_repo_url(repo["repo"])
+    for cached_repo, path in rows:
+        # repos with `additional_dependencies` are cached as `<url>:<deps>`
+        if normalize_repo_url(cached_repo) != repo_url and not cached_repo.startswith(
+            repo["repo"] + ":"
+        ):
+            continue
+        try:
+            with open(os.path.join(path, ".pre-commit-hooks.yaml")) as stream:
+                manifest = yaml.safe_load(stream)
+        except OSError:
+            continue
+        for manifest_hook in manifest or []:
+            if manifest_hook.get("id") == hook["id"]:
+                return manifest_hook
+    return None
+
+
+def is_excluding_all_files(exclude) -> bool:
+    """Determine if an `exclude` pattern disables a hook by excluding every file"""
+    if not exclude:
+        return False
+    try:
+        pattern = re.compile(exclude)
+    except re.error:
+        return False
+    sample_paths = ["README.md", ".pre-commit-config.yaml", "src/main.py"]
+    return all(pattern.search(path) for path in sample_paths)
+
+
+def get_hook_stages(config, repo, config_hook, info) -> list:
+    """Determine the Git hook types a configured hook runs on
+
+    Like pre-commit, stages come from the config, then the repository's
+    manifest, then `default_stages`. When the manifest is not cached yet, the
+    stages declared by the required hook stand in for it.
+    """
+    stages = config_hook.get("stages")
+    if not stages and repo["repo"] not in ["local", "meta"]:
+        manifest_hook = get_manifest_hook(repo, config_hook)
+        if manifest_hook is not None:
+            stages = manifest_hook.get("stages")
+        else:
+            stages = info.get("stages")
+    if not stages:
+        stages = config.get("default_stages")
+    if not stages:
+        return PRE_COMMIT_GIT_HOOK_TYPES
+    # `manual` hooks only run through an explicit `pre-commit run`
+    return [
+        PRE_COMMIT_LEGACY_STAGES.get(stage, stage)
+        for stage in stages
+        if stage != "manual"
+    ]
+
+
+def is_hook_enabled_config(config, repo, config_hook, info) -> bool:
+    """Determine if a hook entry of `.pre-commit-config.yaml` enables the hook"""
+    if repo["repo"] in ["local", "meta"]:
+        # a local stand-in must not satisfy a required upstream hook
+        if info["repo"] != repo["repo"]:
+            return False
+    else:
+        # remote repos are only usable when pinned to a revision
+        if normalize_repo_url(repo["repo"]) != normalize_repo_url(info["repo"]):
+            return False
+        if not repo.get("rev"):
+            return False
+    if is_excluding_all_files(config.get("exclude")) or is_excluding_all_files(
+        config_hook.get("exclude")
+    ):
+        return False
+    stages = get_hook_stages(config, repo, config_hook, info)
+    if "stages" in info:
+        required_stages = [
+            PRE_COMMIT_LEGACY_STAGES.get(stage, stage) for stage in info["stages"]
+        ]
+        stages = [stage for stage in stages if stage in required_stages]
+    if len(stages) < 1:
+        return False
+    # CI runs hooks with `pre-commit run` without installing Git hooks
+    if os.getenv("CI"):
+        return True
+    for stage in stages:
+        if is_git_hook_installed(stage):
+            return True
+    return False
+
+
 def is_hook_installed_config(hook, info) -> bool:
     """Determine if the pre-commit hook is installed and enabled by config YAML"""
     try:
-        with open(".pre-commit-config.yaml", "r") as stream:
-            config = yaml.safe_load(stream)
-            if config["repos"] is not None:
-                for repo in config["repos"]:
-                    for config_hook in repo["hooks"]:
-                        if hook == config_hook["id"]:
-                            return repo["repo"] == info["repo"]
+        config = load_pre_commit_config()
+        if config["repos"] is not None:
+            for repo in config["repos"]:
+                for config_hook in repo["hooks"]:
+                    if hook == config_hook["id"] and is_hook_enabled_config(
+                        config, repo, config_hook, info
+                    ):
+                        return True
     except Exception as e:
         print(e)
     return False
@@ -188,10 +600,79 @@ def validate_git_commit(commit, verbose=False) -> bool:
     return is_commit_ok
 
 
-def get_commits() -> list:
-    """Get commit history on current branch"""
+def get_branch_commit_range(lts_branches, validated_heads=None) -> list:
+    """Revisions of commits on HEAD not reachable from any long-term branch
+
+    Commits reachable from `validated_heads` were already validated and are
+    excluded as well.
+    """
+    # a stale local branch must not hide its newer remote-tracking ref, and
+    # `--ignore-missing` skips branches this clone does not have
+    excluded = []
+    for branch in lts_branches:
+        excluded += [branch, "origin/" + branch]
+    if validated_heads:
+        excluded += [head for head in validated_heads if head not in excluded]
+    # `--` keeps files named like a branch from making revisions ambiguous
+    if len(excluded) < 1:
+        return ["HEAD", "--"]
+    return ["--ignore-missing", "HEAD", "--not"] + excluded + ["--"]
+
+
+def get_history_mode() -> dict:
+    """Detect shallow or partial clones and the commits bounding their history"""
+    history = {"shallow": False, "partial": False, "boundary": []}
+    history["shallow"] = (
+        subprocess.getoutput("git rev-parse --is-shallow-repository") == "true"
+    )
+    if history["shallow"]:
+        shallow_path = subprocess.getoutput("git rev-parse --git-path shallow")
+        if os.path.exists(shallow_path):
+            with open(shallow_path) as shallow_file:
+                history["boundary"] = shallow_file.read().split()
+    # partial clones record a promisor remote or the partialClone extension
+    promisors = subprocess.run(
+        [
+            "git",
+            "config",
+            "--get-regexp",
+            r"^(remote\..*\.promisor|extensions\.partialclone)$",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    history["partial"] = promisors.returncode == 0 and len(promisors.stdout.strip()) > 0
+    return history
+
+
+def is_clone_boundary_error(history, output) -> bool:
+    """Determine if git failed on an object beyond a shallow or promisor boundary"""
+    if history["shallow"] == False and history["partial"] == False:
+        return False
+    return (
+        re.search(
+            "lazy fetching disabled|could not read|unable to read"
+            "|missing (blob|tree|commit) object|failed to traverse parents",
+            output,
+            re.I,
+        )
+        is not None
+    )
+
+
+def get_commits(revisions=None, history=None) -> list:
+    """Get commit history on current branch, optionally limited to `revisions`"""
+    cmd = ["git", "log"]
+    env = None
+    if history is not None and (history["shallow"] or history["partial"]):
+        # commit objects hold the messages: never let git fetch missing objects
+        # (GIT_NO_LAZY_FETCH is honoured by git 2.44 and later)
+        cmd += ["--no-mailmap", "--no-decorate", "--format=medium"]
+        env = dict(os.environ, GIT_NO_LAZY_FETCH="1")
+    if revisions:
+        cmd += revisions
     lines = (
-        subprocess.check_output(["git", "log"], stderr=subprocess.STDOUT)
+        subprocess.check_output(cmd, stderr=subprocess.STDOUT, env=env)
         .decode("utf-8")
         .split("\n")
     )
@@ -230,6 +711,14 @@ def get_commits() -> list:
 
 
 def main(argv: Sequence[str] | None = None) -> int:
+    # persist the state once, whichever check decides the exit code
+    try:
+        return run_checks(argv)
+    finally:
+        save_state()
+
+
+def run_checks(argv: Sequence[str] | None = None) -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--forced", default="False", help="check README.md")
 
@@ -293,11 +782,52 @@ def main(argv: Sequence[str] | None = None) -> int:
         load_config()
 
     if oaf_config["cache"]["OAF_WATCH_COMMIT_HISTORY"]:
-        commits = get_commits()
+        history = get_history_mode()
+        if history["shallow"]:
+            print(
+                "%sShallow clone: commit history checked down to %s only %s"
+                % (
+                    TERMINAL_COLOR_WARNING,
+                    ",".join(history["boundary"]),
+                    TERMINAL_COLOR_NORMAL,
+                )
+            )
+        state = load_state()
+        heads_key = get_validated_heads_key(oaf_lts_branches)
+        validated_heads = state["validated_heads"].setdefault(heads_key, [])
+        missing_heads = get_missing_commits(validated_heads)
+        if len(missing_heads) > 0:
+            drop_validated_heads(heads_key, missing_heads)
+            # the state file may have been reset by a concurrent run
+            validated_heads = load_state()["validated_heads"].setdefault(heads_key, [])
+        try:
+            commits = get_commits(
+                get_branch_commit_range(oaf_lts_branches, validated_heads), history
+            )
+        except subprocess.CalledProcessError as e:
+            output = e.output.decode("utf-8", "replace")
+            if is_clone_boundary_error(history, output) == False:
+                print(
+                    "%sFailed to read commit history: %s %s"
+                    % (TERMINAL_COLOR_ERROR, output, TERMINAL_COLOR_NORMAL)
+                )
+                return 3
+            print(
+                "%sSkipping commit history on minimal clone: %s %s"
+                % (TERMINAL_COLOR_WARNING, output, TERMINAL_COLOR_NORMAL)
+            )
+            commits = []
+        are_commits_ok = len(commits) > 0
         for commit in commits:
             is_commit_ok = validate_git_commit(commit)
             if is_commit_ok == False and is_branch_lts == False:
                 return 3
+            are_commits_ok = are_commits_ok and is_commit_ok
+        # a truncated history must not vouch for commits beyond the boundary
+        # once the clone is deepened
+        head = subprocess.getoutput("git rev-parse HEAD")
+        if are_commits_ok and not history["shallow"] and head not in validated_heads:
+            add_validated_head(heads_key, head)
 
     # check current commit message (e.g. prepare-commit-msg) using gitlint
     if len(oaf_config["cache"]) < 1:
@@ -308,9 +838,16 @@ def main(argv: Sequence[str] | None = None) -> int:
         return 4
     else:
         # check on .gitlint
-        gitlint_path = subprocess.getoutput("git rev-parse --show-toplevel")
-        gitlint_path += "/.gitlint"
+        gitlint_path = get_repository_paths()["toplevel"] + "/.gitlint"
+        gitlint_state = load_state()["gitlint"]
+        gitlint_fingerprint = get_file_fingerprint(gitlint_path)
         try:
+            if (
+                len(gitlint_fingerprint) > 0
+                and gitlint_state.get(gitlint_path) == gitlint_fingerprint
+            ):
+                # unchanged since it was last found complete
+                return 0
             if os.path.exists(gitlint_path) == False:
                 print(
                     "%s installing .gitlint at %s %s"
@@ -347,6 +884,8 @@ def main(argv: Sequence[str] | None = None) -> int:
                         )
                         gitlint_file.close()
                         return 4
+                gitlint_file.close()
+                set_gitlint_state(gitlint_path, gitlint_fingerprint)
         except Exception as e:
             print(
                 "%sFailed to read .gitlint config from %s : %s %s"
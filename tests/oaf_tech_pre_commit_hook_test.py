@@ -1,17 +1,55 @@
 from __future__ import annotations
 
 import json
+import os
+import shutil
+import sqlite3
 import subprocess
 
 import pytest
 
+from pre_commit_hooks import oaf_tech_pre_commit_hook
 from pre_commit_hooks.oaf_tech_pre_commit_hook import (
+    get_missing_commits,
+    get_branch_commit_range,
     get_commits,
     get_current_branch_name,
-    is_hook_installed,
+    get_history_mode,
+    get_pre_commit_config_path,
+    is_clone_boundary_error,
+    is_excluding_all_files,
+    is_hook_installed_config,
     load_config,
+    add_validated_head,
+    load_pre_commit_config,
+    main,
+    normalize_repo_url,
+    read_cache,
+    save_state,
+    set_gitlint_state,
+    update_cache,
     validate_git_commit,
 )
+from pre_commit_hooks.utils import is_hook_installed
+
+
+@pytest.fixture
+def hook_state(monkeypatch, tmp_path):
+    """Isolate the cached hook state of a fake repository rooted at `tmp_path`"""
+    monkeypatch.setenv("PRE_COMMIT_HOME", str(tmp_path))
+    monkeypatch.setattr(
+        oaf_tech_pre_commit_hook,
+        "oaf_state",
+        {"file": None, "repos": {}, "configs": {}, "dirty": []},
+    )
+    repository = {
+        "toplevel": str(tmp_path),
+        "common_dir": str(tmp_path / ".git"),
+        "hooks_dir": str(tmp_path / "hooks"),
+        "superproject": None,
+    }
+    monkeypatch.setattr(oaf_tech_pre_commit_hook, "oaf_repository", repository)
+    return repository
 
 
 # Tests that the function correctly identifies the pre-commit home directory and cache directory when pre_commit_home exists. tags: [happy path]
@@ -342,3 +380,561 @@ def test_get_commits_non_standard_characters_in_author_name(self, mocker):
     assert commits[0]["hash"] == "abc123"
     assert commits[0]["title"] == "This is a commit message."
     assert commits[0]["message"] == ""
+
+
+# Tests that the function passes the requested revision range to git log. tags: [happy path]
+def test_get_commits_with_revisions(mocker):
+    check_output = mocker.patch(
+        "subprocess.check_output",
+        return_value=b"commit abc123\nAuthor: John Doe\nDate: 2021-01-01\n\n    feat: add new feature",
+    )
+    commits = get_commits(["HEAD", "--not", "def456"])
+    assert len(commits) == 1
+    assert check_output.call_args[0][0] == ["git", "log", "HEAD", "--not", "def456"]
+
+
+# Tests that the history excludes both local and remote-tracking long-term branches. tags: [happy path]
+def test_get_branch_commit_range_excludes_lts_history(mocker):
+    run = mocker.patch("subprocess.run")
+    assert get_branch_commit_range(["develop", "main"]) == [
+        "--ignore-missing",
+        "HEAD",
+        "--not",
+        "develop",
+        "origin/develop",
+        "main",
+        "origin/main",
+        "--",
+    ]
+    run.assert_not_called()
+
+
+# Tests that already validated heads are excluded from the history. tags: [general behavior]
+def test_get_branch_commit_range_validated_heads():
+    assert get_branch_commit_range(["main"], ["abc123"]) == [
+        "--ignore-missing",
+        "HEAD",
+        "--not",
+        "main",
+        "origin/main",
+        "abc123",
+        "--",
+    ]
+
+
+# Tests that the whole history is walked when there is no long-term branch. tags: [edge case]
+def test_get_branch_commit_range_no_lts_branch():
+    assert get_branch_commit_range([]) == ["HEAD", "--"]
+
+
+# Tests that a single git log bounds the history by existing long-term branches. tags: [happy path]
+def test_get_commits_branch_range(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    git = ["git", "-c", "user.name=a", "-c", "user.email=a@b"]
+    subprocess.check_call(["git", "init", "-q", "-b", "main"])
+    subprocess.check_call(git + ["commit", "-q", "--allow-empty", "-m", "main"])
+    subprocess.check_call(["git", "checkout", "-q", "-b", "feature/X-1-a"])
+    subprocess.check_call(git + ["commit", "-q", "--allow-empty", "-m", "feat: a"])
+    # a directory named like a long-term branch must not make `main` ambiguous
+    (tmp_path / "main").mkdir()
+    commits = get_commits(get_branch_commit_range(["develop", "main", "master"]))
+    assert [commit["title"] for commit in commits] == ["feat: a"]
+
+
+# Tests that the function reports the boundary commits of a shallow clone. tags: [happy path]
+def test_get_history_mode_shallow(mocker, tmp_path):
+    shallow_path = tmp_path / "shallow"
+    shallow_path.write_text("abc123\n")
+    mocker.patch("subprocess.getoutput", side_effect=["true", str(shallow_path)])
+    mocker.patch(
+        "subprocess.run", return_value=subprocess.CompletedProcess([], 1, stdout=b"")
+    )
+    history = get_history_mode()
+    assert history == {"shallow": True, "partial": False, "boundary": ["abc123"]}
+
+
+# Tests that the function detects a partial clone from its promisor remote. tags: [happy path]
+def test_get_history_mode_partial(mocker):
+    mocker.patch("subprocess.getoutput", return_value="false")
+    run = mocker.patch(
+        "subprocess.run",
+        return_value=subprocess.CompletedProcess(
+            [], 0, stdout=b"remote.origin.promisor true\n"
+        ),
+    )
+    history = get_history_mode()
+    assert history == {"shallow": False, "partial": True, "boundary": []}
+    # the regex is passed as an argument, never through a shell
+    assert run.call_args[0][0][:3] == ["git", "config", "--get-regexp"]
+
+
+# Tests that a failing git config does not report a partial clone. tags: [edge case]
+def test_get_history_mode_not_partial(mocker):
+    mocker.patch("subprocess.getoutput", return_value="false")
+    mocker.patch(
+        "subprocess.run",
+        return_value=subprocess.CompletedProcess([], 1, stdout=b""),
+    )
+    history = get_history_mode()
+    assert history == {"shallow": False, "partial": False, "boundary": []}
+
+
+# Tests that only missing objects beyond the clone's boundary are tolerated. tags: [edge case]
+def test_is_clone_boundary_error():
+    partial = {"shallow": False, "partial": True, "boundary": []}
+    full = {"shallow": False, "partial": False, "boundary": []}
+    missing = "warning: lazy fetching disabled; some objects may not be available\nfatal: unable to read abc123"
+    assert is_clone_boundary_error(partial, missing) == True
+    assert is_clone_boundary_error(full, missing) == False
+    assert is_clone_boundary_error(partial, "fatal: bad revision 'abc123'") == False
+
+
+# Tests that the function forbids lazy object fetches on minimal clones. tags: [general behavior]
+def test_get_commits_minimal_clone_no_lazy_fetch(mocker):
+    check_output = mocker.patch("subprocess.check_output", return_value=b"")
+    get_commits(["HEAD"], {"shallow": False, "partial": True, "boundary": []})
+    assert "--no-mailmap" in check_output.call_args[0][0]
+    assert check_output.call_args[1]["env"]["GIT_NO_LAZY_FETCH"] == "1"
+
+
+# Tests that a submodule without its own config reuses the superproject's config. tags: [happy path]
+def test_get_pre_commit_config_path_superproject(monkeypatch, tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / ".pre-commit-config.yaml").write_text("repos: []\n")
+    monkeypatch.setattr(
+        oaf_tech_pre_commit_hook,
+        "oaf_repository",
+        {
+            "toplevel": str(tmp_path / "sub"),
+            "common_dir": str(tmp_path / ".git/modules/sub"),
+            "superproject": str(tmp_path),
+        },
+    )
+    assert get_pre_commit_config_path() == str(tmp_path / ".pre-commit-config.yaml")
+
+
+# Tests that an unchanged .pre-commit-config.yaml is parsed only once across runs. tags: [general behavior]
+def test_load_pre_commit_config_cached(hook_state, mocker, tmp_path):
+    (tmp_path / ".pre-commit-config.yaml").write_text("repos: []\n")
+    assert load_pre_commit_config() == {"repos": []}
+    save_state()
+    # a new run (e.g. from another worktree) reloads the persisted state
+    oaf_tech_pre_commit_hook.oaf_state["file"] = None
+    safe_load = mocker.patch.object(oaf_tech_pre_commit_hook.yaml, "safe_load")
+    assert load_pre_commit_config() == {"repos": []}
+    safe_load.assert_not_called()
+
+
+# Tests that cached data is written atomically in the versioned schema. tags: [happy path]
+def test_update_cache_round_trip(tmp_path):
+    cache_path = str(tmp_path / "cache.json")
+    update_cache(cache_path, lambda cache: dict(cache, key="value"))
+    update_cache(cache_path, lambda cache: dict(cache, other="value"))
+    assert read_cache(cache_path) == {"key": "value", "other": "value"}
+    with open(cache_path) as json_file:
+        cache = json.load(json_file)
+    assert cache["version"] == oaf_tech_pre_commit_hook.OAF_CACHE_SCHEMA_VERSION
+    assert cache["writes"] == 2
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "cache.json",
+        "cache.json.lock",
+    ]
+
+
+# Tests that cache files of another schema or corrupted by a torn write are ignored. tags: [edge case]
+def test_read_cache_ignores_unknown_schema(tmp_path):
+    cache_path = tmp_path / "cache.json"
+    cache_path.write_text(json.dumps({"OAF_GIT_COMMIT_TYPES": ["feat"]}))
+    assert read_cache(str(cache_path)) == {}
+    cache_path.write_text('{"version": 1, "data": {')
+    assert read_cache(str(cache_path)) == {}
+
+
+# Tests that an offline run keeps using the unversioned config cached by v1.3.x. tags: [edge case]
+def test_load_config_migrates_unversioned_cache(monkeypatch, mocker, tmp_path):
+    monkeypatch.setenv("PRE_COMMIT_HOME", str(tmp_path))
+    mocker.patch.object(
+        oaf_tech_pre_commit_hook, "urlopen", side_effect=OSError("offline")
+    )
+    monkeypatch.setattr(
+        oaf_tech_pre_commit_hook, "oaf_config", {"cache": {}, "live": {}}
+    )
+    cached_config = {
+        "OAF_GIT_BRANCH_NAME_REGEX": "^feature/.*$",
+        "OAF_REQUIRED_HOOKS": {},
+    }
+    (tmp_path / "oaf_pre-commit_config.json").write_text(json.dumps(cached_config))
+    load_config()
+    assert oaf_tech_pre_commit_hook.oaf_config["cache"] == cached_config
+
+
+# Tests that the cache is compacted periodically. tags: [general behavior]
+def test_update_cache_periodic_compaction(monkeypatch, tmp_path):
+    monkeypatch.setattr(oaf_tech_pre_commit_hook, "OAF_CACHE_COMPACTION_INTERVAL", 2)
+    cache_path = str(tmp_path / "cache.json")
+    compactions = []
+
+    def compact(cache):
+        compactions.append(len(cache))
+        return {}
+
+    update_cache(cache_path, lambda cache: dict(cache, first=1), compact)
+    assert compactions == []
+    update_cache(cache_path, lambda cache: dict(cache, second=2), compact)
+    assert compactions == [2]
+    assert read_cache(cache_path) == {}
+
+
+# Tests that equivalent repository URLs are normalized to the same URL. tags: [happy path]
+def test_normalize_repo_url():
+    expected = "https://github.com/jorisroovers/gitlint"
+    assert normalize_repo_url("https://github.com/jorisroovers/gitlint") == expected
+    assert normalize_repo_url("http://github.com/jorisroovers/gitlint.git") == expected
+    assert normalize_repo_url("https://GitHub.com/jorisroovers/gitlint/") == expected
+    assert normalize_repo_url("git@github.com:jorisroovers/gitlint.git") == expected
+
+
+# Tests that only exclude patterns matching every file disable a hook. tags: [edge case]
+def test_is_excluding_all_files():
+    assert is_excluding_all_files(".*") == True
+    assert is_excluding_all_files(".+") == True
+    assert is_excluding_all_files("^tests/fixtures/") == False
+    assert is_excluding_all_files(None) == False
+
+
+def configure_pre_commit(monkeypatch, tmp_path, config):
+    monkeypatch.delenv("CI", raising=False)
+    (tmp_path / ".pre-commit-config.yaml").write_text(config)
+    (tmp_path / "hooks").mkdir()
+
+
+GITLINT_INFO = {"args": [], "repo": "https://github.com/jorisroovers/gitlint"}
+
+
+# Tests that a pinned hook with installed Git hooks is resolved without running pre-commit. tags: [happy path]
+def test_is_hook_installed_config_installed(hook_state, monkeypatch, mocker, tmp_path):
+    configure_pre_commit(
+        monkeypatch,
+        tmp_path,
+        "repos:\n"
+        "  - repo: http://github.com/jorisroovers/gitlint.git\n"
+        "    rev: v0.19.1\n"
+        "    hooks:\n"
+        "      - id: gitlint\n"
+        "        stages: [commit-msg]\n",
+    )
+    (tmp_path / "hooks" / "commit-msg").write_text(
+        "# File generated by pre-commit: https://pre-commit.com\n"
+    )
+    getoutput = mocker.patch("subprocess.getoutput")
+    assert is_hook_installed_config("gitlint", GITLINT_INFO) == True
+    getoutput.assert_not_called()
+
+
+# Tests that a hook is not resolved when pre-commit did not install its Git hook. tags: [edge case]
+def test_is_hook_installed_config_git_hook_missing(hook_state, monkeypatch, tmp_path):
+    configure_pre_commit(
+        monkeypatch,
+        tmp_path,
+        "repos:\n"
+        "  - repo: https://github.com/jorisroovers/gitlint\n"
+        "    rev: v0.19.1\n"
+        "    hooks:\n"
+        "      - id: gitlint\n",
+    )
+    assert is_hook_installed_config("gitlint", GITLINT_INFO) == False
+    monkeypatch.setenv("CI", "true")
+    assert is_hook_installed_config("gitlint", GITLINT_INFO) == True
+
+
+# Tests that unpinned, manual-only or fully excluded hooks are not enabled. tags: [edge case]
+def test_is_hook_installed_config_disabled(hook_state, monkeypatch, tmp_path):
+    configure_pre_commit(
+        monkeypatch,
+        tmp_path,
+        "repos:\n"
+        "  - repo: https://github.com/jorisroovers/gitlint\n"
+        "    hooks:\n"
+        "      - id: gitlint\n"
+        "  - repo: https://github.com/jorisroovers/gitlint\n"
+        "    rev: v0.19.1\n"
+        "    hooks:\n"
+        "      - id: gitlint\n"
+        "        stages: [manual]\n"
+        "      - id: gitlint\n"
+        "        exclude: .*\n",
+    )
+    (tmp_path / "hooks" / "pre-commit").write_text(
+        "# File generated by pre-commit: https://pre-commit.com\n"
+    )
+    assert is_hook_installed_config("gitlint", GITLINT_INFO) == False
+
+
+def cache_pre_commit_repo(tmp_path, repo, rev, manifest):
+    clone = tmp_path / "repo_clone"
+    clone.mkdir()
+    (clone / ".pre-commit-hooks.yaml").write_text(manifest)
+    with sqlite3.connect(str(tmp_path / "db.db")) as db:
+        db.execute("CREATE TABLE repos (repo TEXT, ref TEXT, path TEXT)")
+        db.execute("INSERT INTO repos VALUES (?, ?, ?)", (repo, rev, str(clone)))
+
+
+# Tests that the stages of the hook's manifest decide which Git hook must be installed. tags: [edge case]
+def test_is_hook_installed_config_manifest_stages(hook_state, monkeypatch, tmp_path):
+    configure_pre_commit(
+        monkeypatch,
+        tmp_path,
+        "repos:\n"
+        "  - repo: https://github.com/jorisroovers/gitlint\n"
+        "    rev: v0.19.1\n"
+        "    hooks:\n"
+        "      - id: gitlint\n",
+    )
+    cache_pre_commit_repo(
+        tmp_path,
+        "https://github.com/jorisroovers/gitlint",
+        "v0.19.1",
+        "- id: gitlint\n  entry: gitlint\n  stages: [commit-msg]\n",
+    )
+    (tmp_path / "hooks" / "pre-commit").write_text(
+        "# File generated by pre-commit: https://pre-commit.com\n"
+    )
+    assert is_hook_installed_config("gitlint", GITLINT_INFO) == False
+    (tmp_path / "hooks" / "commit-msg").write_text(
+        "# File generated by pre-commit: https://pre-commit.com\n"
+    )
+    assert is_hook_installed_config("gitlint", GITLINT_INFO) == True
+
+
+# Tests that the required hook's stages stand in for a manifest pre-commit has not cloned. tags: [edge case]
+def test_is_hook_installed_config_required_stages(hook_state, monkeypatch, tmp_path):
+    configure_pre_commit(
+        monkeypatch,
+        tmp_path,
+        "repos:\n"
+        "  - repo: https://github.com/jorisroovers/gitlint\n"
+        "    rev: v0.19.1\n"
+        "    hooks:\n"
+        "      - id: gitlint\n",
+    )
+    (tmp_path / "hooks" / "pre-commit").write_text(
+        "# File generated by pre-commit: https://pre-commit.com\n"
+    )
+    info = dict(GITLINT_INFO, stages=["commit-msg"])
+    assert is_hook_installed_config("gitlint", info) == False
+
+
+# Tests that a submodule using its superproject's config needs its own Git hooks. tags: [general behavior]
+def test_is_hook_installed_config_submodule(hook_state, monkeypatch, tmp_path):
+    configure_pre_commit(
+        monkeypatch,
+        tmp_path,
+        "repos:\n"
+        "  - repo: https://github.com/jorisroovers/gitlint\n"
+        "    rev: v0.19.1\n"
+        "    hooks:\n"
+        "      - id: gitlint\n",
+    )
+    (tmp_path / "sub").mkdir()
+    oaf_tech_pre_commit_hook.oaf_repository.update(
+        toplevel=str(tmp_path / "sub"),
+        superproject=str(tmp_path),
+    )
+    assert is_hook_installed_config("gitlint", GITLINT_INFO) == False
+    (tmp_path / "hooks" / "pre-commit").write_text(
+        "# File generated by pre-commit: https://pre-commit.com\n"
+    )
+    assert is_hook_installed_config("gitlint", GITLINT_INFO) == True
+
+
+# Tests that a local hook only satisfies a requirement on a local hook. tags: [general behavior]
+def test_is_hook_installed_config_local_repo(hook_state, monkeypatch, tmp_path):
+    configure_pre_commit(
+        monkeypatch,
+        tmp_path,
+        "repos:\n"
+        "  - repo: local\n"
+        "    hooks:\n"
+        "      - id: gitlint\n"
+        "        name: gitlint\n"
+        "        entry: gitlint\n"
+        "        language: system\n"
+        "        stages: [commit]\n",
+    )
+    (tmp_path / "hooks" / "pre-commit").write_text(
+        "# File generated by pre-commit: https://pre-commit.com\n"
+    )
+    assert is_hook_installed_config("gitlint", GITLINT_INFO) == False
+    local_info = {"args": [], "repo": "local"}
+    assert is_hook_installed_config("gitlint", local_info) == True
+
+
+# Tests that a config with YAML dates is cached as JSON. tags: [edge case]
+def test_load_pre_commit_config_yaml_date(hook_state, tmp_path):
+    (tmp_path / ".pre-commit-config.yaml").write_text(
+        "repos:\n  - repo: https://github.com/jorisroovers/gitlint\n"
+        "    rev: 2023-01-01\n    hooks: []\n"
+    )
+    config = load_pre_commit_config()
+    save_state()
+    assert config["repos"][0]["rev"] == "2023-01-01"
+    state = read_cache(str(tmp_path / "oaf_pre-commit_state.json"))
+    assert list(state["configs"].values())[0]["config"] == config
+
+
+# Tests that saving the state only writes entries changed by this run. tags: [general behavior]
+def test_save_state_merges_dirty_entries_only(hook_state, tmp_path):
+    common_dir = hook_state["common_dir"]
+    state_path = str(tmp_path / "oaf_pre-commit_state.json")
+    stale_state = {
+        "repos": {
+            common_dir: {
+                "validated_heads": {"main:feat": ["old"]},
+                "gitlint": {"/repo/.gitlint": [1, 1]},
+            }
+        },
+        "configs": {"/repo/.pre-commit-config.yaml": {"fingerprint": [1, 1]}},
+    }
+    update_cache(state_path, lambda cache: stale_state)
+    oaf_tech_pre_commit_hook.load_state()
+    # a concurrent run refreshes entries and compacts the old head away
+    update_cache(
+        state_path,
+        lambda cache: {
+            "repos": {
+                common_dir: {
+                    "validated_heads": {"main:feat": []},
+                    "gitlint": {"/repo/.gitlint": [2, 2]},
+                }
+            },
+            "configs": {"/repo/.pre-commit-config.yaml": {"fingerprint": [2, 2]}},
+        },
+    )
+    add_validated_head("main:feat", "new")
+    set_gitlint_state("/other/.gitlint", [3, 3])
+    save_state()
+    state = read_cache(state_path)
+    assert state["repos"][common_dir] == {
+        "validated_heads": {"main:feat": ["new"]},
+        "gitlint": {"/repo/.gitlint": [2, 2], "/other/.gitlint": [3, 3]},
+    }
+    assert state["configs"] == {
+        "/repo/.pre-commit-config.yaml": {"fingerprint": [2, 2]}
+    }
+
+
+GIT = ["git", "-c", "user.name=a", "-c", "user.email=a@b"]
+
+
+def init_hook_repo(monkeypatch, tmp_path):
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    monkeypatch.chdir(repo)
+    monkeypatch.setenv("CI", "true")
+    for name in [".pre-commit-config.yaml", ".gitlint"]:
+        shutil.copy(os.path.join(repo_root, name), str(repo / name))
+    subprocess.check_call(["git", "init", "-q", "-b", "main"])
+    subprocess.check_call(["git", "add", "."])
+    subprocess.check_call(GIT + ["commit", "-q", "-m", "chore: init"])
+    subprocess.check_call(["git", "checkout", "-q", "-b", "feature/X-1-a"])
+    subprocess.check_call(GIT + ["commit", "-q", "--allow-empty", "-m", "feat: a"])
+    monkeypatch.setattr(
+        oaf_tech_pre_commit_hook,
+        "oaf_config",
+        {
+            "cache": {
+                "OAF_GIT_BRANCH_NAME_REGEX": ".*",
+                "OAF_WATCH_COMMIT_HISTORY": True,
+                "OAF_GIT_BRANCH_NAME_EXCEPTION": ["main"],
+                "OAF_GIT_COMMIT_TYPES": ["feat", "chore"],
+                "OAF_REQUIRED_HOOKS": {"gitlint": GITLINT_INFO},
+            },
+            "live": {},
+        },
+    )
+    # resolve the real repository instead of the fake one
+    oaf_tech_pre_commit_hook.oaf_repository.clear()
+    return repo
+
+
+# Tests that a cached HEAD pruned after an amend is dropped instead of breaking git log. tags: [edge case]
+def test_main_drops_pruned_validated_head(hook_state, monkeypatch, tmp_path):
+    repo = init_hook_repo(monkeypatch, tmp_path)
+    assert main([]) == 0
+    pruned_head = subprocess.getoutput("git rev-parse HEAD")
+    subprocess.check_call(
+        GIT + ["commit", "-q", "--amend", "--allow-empty", "-m", "feat: b"]
+    )
+    subprocess.check_call(["git", "reflog", "expire", "--expire=now", "--all"])
+    subprocess.check_call(["git", "gc", "-q", "--prune=now"])
+    assert get_missing_commits([pruned_head]) == [pruned_head]
+
+    oaf_tech_pre_commit_hook.oaf_state["file"] = None
+    assert main([]) == 0
+    state = read_cache(str(tmp_path / "oaf_pre-commit_state.json"))
+    validated_heads = state["repos"][str(repo / ".git")]["validated_heads"]
+    assert validated_heads == {
+        "main:feat,chore": [subprocess.getoutput("git rev-parse HEAD")]
+    }
+
+
+# Tests that a HEAD checked only down to a shallow boundary is not cached as validated. tags: [edge case]
+def test_main_shallow_head_not_validated(hook_state, monkeypatch, tmp_path):
+    repo = init_hook_repo(monkeypatch, tmp_path)
+    clone = tmp_path / "clone"
+    subprocess.check_call(
+        ["git", "clone", "-q", "--depth", "1", repo.as_uri(), str(clone)]
+    )
+    monkeypatch.chdir(clone)
+    assert main([]) == 0
+    state = read_cache(str(tmp_path / "oaf_pre-commit_state.json"))
+    validated_heads = state["repos"][str(clone / ".git")]["validated_heads"]
+    assert validated_heads.get("main:feat,chore", []) == []
+
+
+# Tests that dropping missing heads survives a state file reset by a concurrent run. tags: [edge case]
+def test_main_drops_heads_after_state_reset(hook_state, monkeypatch, mocker, tmp_path):
+    repo = init_hook_repo(monkeypatch, tmp_path)
+    state_path = str(tmp_path / "oaf_pre-commit_state.json")
+    missing_head = "1" * 40
+    update_cache(
+        state_path,
+        lambda cache: {
+            "repos": {
+                str(repo / ".git"): {
+                    "validated_heads": {"main:feat,chore": [missing_head]},
+                    "gitlint": {},
+                }
+            },
+            "configs": {},
+        },
+    )
+
+    def reset_state(shas):
+        os.remove(state_path)
+        return [missing_head]
+
+    mocker.patch.object(
+        oaf_tech_pre_commit_hook, "get_missing_commits", side_effect=reset_state
+    )
+    assert main([]) == 0
+
+
+# Tests that a run persists its state with a single cache write. tags: [general behavior]
+def test_main_saves_state_once(hook_state, monkeypatch, mocker, tmp_path):
+    init_hook_repo(monkeypatch, tmp_path)
+    update = mocker.spy(oaf_tech_pre_commit_hook, "update_cache")
+    assert main([]) == 0
+    assert update.call_count == 1
+    state = read_cache(str(tmp_path / "oaf_pre-commit_state.json"))
+    assert len(state["configs"]) == 1
+
+
+# Tests that the state is persisted when a check fails. tags: [edge case]
+def test_main_saves_state_on_failure(hook_state, monkeypatch, tmp_path):
+    init_hook_repo(monkeypatch, tmp_path)
+    subprocess.check_call(GIT + ["commit", "-q", "--allow-empty", "-m", "bad"])
+    assert main([]) == 3
+    state = read_cache(str(tmp_path / "oaf_pre-commit_state.json"))
+    assert len(state["configs"]) == 1